@@ -1,16 +1,19 @@
 import os
+import numpy as np
 import pandas as pd
 import re
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import pytz
-from coinmetrics.api_client import CoinMetricsClient
+import market_utils
 
-def init_client():
-    api_key = os.environ.get("CM_API_KEY")
-    if not api_key:
-        raise ValueError("CM_API_KEY environment variable not set")
-    return CoinMetricsClient(api_key)
+# Deribit option markets look like deribit-BTC-10APR22-34000-C-option
+_MARKET_RE = re.compile(
+    r'-(?P<day>\d{1,2})(?P<month>[A-Z]{3})(?P<year>\d{2})-(?P<strike>\d+)-(?P<option_type>[CP])-option$'
+)
+
+# Month numbers derived from market_utils, so both parsers read market dates the same way
+_MONTH_NUMBERS = {abbr: int(month) for abbr, month in market_utils._MONTH_MAP.items()}
 
 def extract_expiration_date(market_name):
     """Extract expiration date from market name.
@@ -18,54 +21,29 @@ def extract_expiration_date(market_name):
     - deribit-BTC-10APR22-34000-C-option
     - deribit-BTC-24MAY24-70000-P-option
     """
-    try:
-        # Extract the date portion (like 10APR22)
-        match = re.search(r'-([0-9]+[A-Z]{3}[0-9]{2})-', market_name)
-        if not match:
-            return None
-        
-        date_str = match.group(1)
-        
-        # Convert month abbreviation to number
-        month_map = {
-            'JAN': '01', 'FEB': '02', 'MAR': '03', 'APR': '04',
-            'MAY': '05', 'JUN': '06', 'JUL': '07', 'AUG': '08',
-            'SEP': '09', 'OCT': '10', 'NOV': '11', 'DEC': '12'
-        }
-        
-        day = date_str[:2]
-        month_abbr = date_str[2:5]
-        year = '20' + date_str[5:7]  # Assuming all years are 20xx
-        
-        if month_abbr in month_map:
-            month = month_map[month_abbr]
-            return f"{year}-{month}-{day}T08:00:00+00:00"  # Adding time component with UTC timezone
-        return None
-    except Exception:
+    # Parse the date with market_utils and add the 08:00 UTC expiry time
+    expiration_date = market_utils.extract_expiration_date(market_name)
+    if expiration_date is None:
         return None
+    return f"{expiration_date}T08:00:00+00:00"
 
 def extract_strike_and_type(market_name):
     """Extract strike price and option type from market name.
     Example: deribit-BTC-10APR22-34000-C-option
     """
     try:
-        parts = market_name.split('-')
-        if len(parts) >= 6:
-            try:
-                strike = float(parts[4])
-                option_type = parts[5]
-                return strike, option_type
-            except ValueError:
-                # If strike can't be converted to float, return None
-                return None, parts[5] if len(parts) > 5 else None
-        return None, None
+        # Scalar fallback; analyze_greek_markets parses the whole column with _MARKET_RE
+        match = _MARKET_RE.search(market_name)
+        if not match:
+            return None, None
+        return float(match.group('strike')), match.group('option_type')
     except Exception:
         return None, None
 
 def analyze_greek_markets():
-    client = init_client()
+    client = market_utils.init_client()
     print("Fetching catalog data for Greeks...")
-    catalog = client.catalog_market_greeks_v2(exchange='deribit', base='btc').to_dataframe()
+    catalog = market_utils.load_catalog(client.catalog_market_greeks_v2, exchange='deribit', base='btc')
     
     if catalog.empty:
         print("No catalog data found.")
@@ -81,27 +59,42 @@ def analyze_greek_markets():
     print("\nSample of catalog data:")
     print(catalog.head())
     
-    # Extract expiration dates from market names (with timezone info)
-    catalog['expiration_str'] = catalog['market'].apply(extract_expiration_date)
-    catalog = catalog[catalog['expiration_str'].notna()]  # Remove rows where expiration couldn't be extracted
+    # Extract expiration date, strike and option type from market names in a single vectorized pass
+    parts = catalog['market'].str.extract(_MARKET_RE)
+    parts['month'] = parts['month'].map(_MONTH_NUMBERS)
     
-    print(f"\nSuccessfully extracted expiration dates for {len(catalog)} markets")
+    # Remove rows where expiration couldn't be extracted
+    valid = parts['month'].notna().to_numpy()
+    catalog = catalog[valid].copy()
+    parts = parts[valid]
     
-    # Convert expiration strings to datetime (already timezone aware)
-    catalog['expiration_date'] = pd.to_datetime(catalog['expiration_str'])
+    # Build expiry dates from integer year/month/day with datetime64 arithmetic
+    # (months since epoch -> first of month -> add days), avoiding string formatting and parsing
+    years = parts['year'].astype('int64').to_numpy() + 2000
+    months = parts['month'].astype('int64').to_numpy()
+    days = parts['day'].astype('int64').to_numpy()
+    expiry_days = ((years - 1970) * 12 + months - 1).astype('datetime64[M]').astype('datetime64[D]') + (days - 1)
     
-    # Extract strike and option type
-    catalog[['strike', 'option_type']] = pd.DataFrame(catalog['market'].apply(lambda x: extract_strike_and_type(x)).tolist())
+    # Options expire at 08:00 UTC on the date in the market name
+    catalog['expiration_date'] = pd.to_datetime((expiry_days + np.timedelta64(8, 'h')).astype('datetime64[ns]'), utc=True)
+    catalog['strike'] = parts['strike'].astype('float32').to_numpy()
+    catalog['option_type'] = pd.Categorical(parts['option_type'])
+    
+    print(f"\nSuccessfully extracted expiration dates for {len(catalog)} markets")
+    
+    # Day differences are computed on the underlying datetime64 arrays at hour resolution
+    min_time = catalog['min_time'].values
+    expiration_date = catalog['expiration_date'].values
     
     # Calculate trading period length in days
-    catalog['trading_days'] = (catalog['max_time'] - catalog['min_time']).dt.total_seconds() / (24*60*60)
+    catalog['trading_days'] = (catalog['max_time'].values - min_time).astype('timedelta64[h]').astype('float32') / 24.0
     
     # Calculate days before expiration that trading begins
-    catalog['days_before_expiration'] = (catalog['expiration_date'] - catalog['min_time']).dt.total_seconds() / (24*60*60)
+    catalog['days_before_expiration'] = (expiration_date - min_time).astype('timedelta64[h]').astype('float32') / 24.0
     
     # Calculate days until expiration from now
-    now = datetime.now(pytz.UTC)
-    catalog['days_to_expiration'] = (catalog['expiration_date'] - pd.Timestamp(now)).dt.total_seconds() / (24*60*60)
+    now = pd.Timestamp(datetime.now(pytz.UTC)).to_datetime64()
+    catalog['days_to_expiration'] = (expiration_date - now).astype('timedelta64[h]').astype('float32') / 24.0
     
     # Filter to see options that are still active (not yet expired)
     active_options = catalog[catalog['days_to_expiration'] > 0]
@@ -115,9 +108,10 @@ def analyze_greek_markets():
     print(catalog['days_before_expiration'].describe([0.25, 0.5, 0.75, 0.9, 0.95, 0.99]).round(2))
     
     # Group by year-month of expiration to see patterns over time
-    catalog['exp_year_month'] = catalog['expiration_date'].dt.to_period('M')
+    # (month-start datetime64 keys group as int64; only the aggregated months are formatted as strings)
+    catalog['exp_year_month'] = catalog['expiration_date'].values.astype('datetime64[M]')
     trading_period_by_month = catalog.groupby('exp_year_month')['trading_days'].mean().reset_index()
-    trading_period_by_month['exp_year_month'] = trading_period_by_month['exp_year_month'].astype(str)
+    trading_period_by_month['exp_year_month'] = trading_period_by_month['exp_year_month'].dt.strftime('%Y-%m')
     
     # Get the last 20 months to see recent trends
     recent_months = trading_period_by_month.tail(20)
@@ -164,12 +158,9 @@ def analyze_greek_markets():
             min_strike = valid_strike_df['strike'].min()
             max_strike = valid_strike_df['strike'].max()
             
-            # Create bins based on data range
-            bins = pd.cut(valid_strike_df['strike'], bins=10)
-            valid_strike_df['strike_range'] = bins
-            
-            # Group by strike range
-            trading_by_strike = valid_strike_df.groupby('strike_range')['trading_days'].mean().reset_index()
+            # Group by strike range, with bins based on data range
+            strike_range = pd.cut(valid_strike_df['strike'], bins=10).rename('strike_range')
+            trading_by_strike = valid_strike_df.groupby(strike_range, observed=True)['trading_days'].mean().reset_index()
             
             plt.figure(figsize=(12, 6))
             plt.bar(trading_by_strike['strike_range'].astype(str), trading_by_strike['trading_days'])
@@ -181,8 +172,17 @@ def analyze_greek_markets():
             plt.tight_layout()
             plt.savefig('analysis/trading_period_by_strike.png')
     
-    # Save the analysis to CSV for further exploration
-    catalog.to_csv('analysis/greeks_market_analysis.csv', index=False)
+    # Save the analysis columns to Parquet for further exploration
+    analysis_columns = [
+        'market', 'expiration_date', 'strike', 'option_type',
+        'trading_days', 'days_before_expiration'
+    ]
+    catalog[analysis_columns].to_parquet(
+        'analysis/greeks_market_analysis.parquet',
+        engine='pyarrow',
+        compression='zstd',
+        index=False
+    )
     
     # Print recommendations based on analysis
     percentiles = catalog['days_before_expiration'].describe([0.5, 0.75, 0.9, 0.95]).round(2)
@@ -1,17 +1,12 @@
-import os
 import asyncio
 from datetime import datetime, timedelta
-from coinmetrics.api_client import CoinMetricsClient
 import market_utils
 
-# Initialize client
-def init_client():
-    api_key = os.environ.get("CM_API_KEY")
-    if not api_key:
-        raise ValueError("CM_API_KEY environment variable not set")
-    return CoinMetricsClient(api_key)
+# Greeks are saved as a Parquet dataset with one partition per expiry date
+GREEKS_DATASET_DIR = 'market-greeks-parquet'
+GREEK_COLUMNS = ['delta', 'gamma', 'vega', 'theta', 'rho']
 
-async def fetch_greeks_for_expiry(client, markets, expiry_date, days_before_expiry=22, granularity="1d"):
+async def fetch_greeks_for_expiry(client, markets, expiry_date, days_before_expiry=22, granularity="1d", max_workers=None):
     """
     Fetch Greeks data for markets with the same expiry date.
     
@@ -21,6 +16,7 @@ async def fetch_greeks_for_expiry(client, markets, expiry_date, days_before_expi
         expiry_date: Expiry date (datetime.date)
         days_before_expiry: Number of days before expiry to collect data
         granularity: Data granularity (e.g., "1d", "1h")
+        max_workers: Parallel API requests for this expiry (default: the client's default of 10)
     """
     # Calculate data period based on expiry date
     start_time, end_time = market_utils.calculate_data_period_for_expiry(
@@ -31,14 +27,27 @@ async def fetch_greeks_for_expiry(client, markets, expiry_date, days_before_expi
           f"from {start_time.strftime('%Y-%m-%d')} to {end_time.strftime('%Y-%m-%d')}")
 
     try:
-        # Fetch data with parallelization and export directly to CSV files
-        client.get_market_greeks(
+        # Fetch data with parallelization
+        data = client.get_market_greeks(
             markets=markets,
             start_time=start_time,
             end_time=end_time,
             page_size=10000,
             granularity=granularity,
-        ).parallel().export_to_csv_files()
+        ).parallel(max_workers=max_workers)
+        
+        # The download blocks on HTTP, so run it in a thread to let other expiries proceed meanwhile
+        df = await asyncio.to_thread(data.to_dataframe)
+        
+        if df.empty:
+            print(f"No Greeks data returned for expiry date {expiry_date}")
+            return False
+        
+        # The client returns the Greeks as nullable Float64; store them as float32 (missing values become NaN)
+        df = df.astype({col: 'float32' for col in GREEK_COLUMNS})
+        
+        # Write all markets for this expiry to a single Parquet partition, replacing any previous run
+        market_utils.save_expiry_partition(df, GREEKS_DATASET_DIR, expiry_date)
         
         print(f"Successfully saved Greeks data for expiry date {expiry_date}")
         return True
@@ -48,7 +57,7 @@ async def fetch_greeks_for_expiry(client, markets, expiry_date, days_before_expi
         return False
 
 # Save Greeks data for multiple expiration dates
-async def save_greeks_data(start_date, end_date, days_before_expiry=22, granularity="1d"):
+async def save_greeks_data(start_date, end_date, days_before_expiry=22, granularity="1d", max_requests=market_utils.API_MAX_WORKERS):
     """
     Save Greeks data for all markets expiring between start_date and end_date.
     For each expiry date, collect data from (expiry_date - days_before_expiry) to expiry_date.
@@ -58,10 +67,11 @@ async def save_greeks_data(start_date, end_date, days_before_expiry=22, granular
         end_date: End date for expiry range (datetime)
         days_before_expiry: Number of days before expiry to collect data
         granularity: Data granularity (e.g., "1d", "1h")
+        max_requests: Maximum API requests in flight at once for this collection
     """
     print(f"Looking for options expiring between {start_date.strftime('%Y-%m-%d')} and {end_date.strftime('%Y-%m-%d')}")
     
-    client = init_client()
+    client = market_utils.init_client()
     
     # Get catalog data with expiration dates
     catalog = market_utils.get_markets_with_expiry(
@@ -81,6 +91,13 @@ async def save_greeks_data(start_date, end_date, days_before_expiry=22, granular
         print("No markets found within the specified time window.")
         return None
     
+    # Run tasks in parallel (with a concurrency limit)
+    MAX_CONCURRENT_TASKS = 5  # Adjust based on API rate limits and system capabilities
+    concurrent_tasks = min(MAX_CONCURRENT_TASKS, max_requests)
+    
+    # Split the API request budget across concurrent expiries, so at most max_requests requests are in flight
+    workers_per_task = max(1, max_requests // concurrent_tasks)
+    
     # Create tasks to fetch data for each expiry date
     tasks = []
     for expiry_date, markets in grouped_markets.items():
@@ -89,27 +106,26 @@ async def save_greeks_data(start_date, end_date, days_before_expiry=22, granular
             markets,
             expiry_date,
             days_before_expiry=days_before_expiry,
-            granularity=granularity
+            granularity=granularity,
+            max_workers=workers_per_task
         ))
     
-    # Run tasks in parallel (with a concurrency limit)
-    MAX_CONCURRENT_TASKS = 5  # Adjust based on API rate limits and system capabilities
-    
-    # Split tasks into batches to avoid overwhelming the API
-    results = []
-    for i in range(0, len(tasks), MAX_CONCURRENT_TASKS):
-        batch = tasks[i:i+MAX_CONCURRENT_TASKS]
-        batch_results = await asyncio.gather(*batch)
-        results.extend(batch_results)
-        
-        # Optional: add a small delay between batches
-        if i + MAX_CONCURRENT_TASKS < len(tasks):
-            print(f"Completed batch {i//MAX_CONCURRENT_TASKS + 1}, waiting before starting next batch...")
-            await asyncio.sleep(2)
+    # Start the next task as soon as any running one finishes, rather than waiting on whole batches
+    results = await market_utils.gather_with_concurrency(tasks, concurrent_tasks)
     
     successful = results.count(True)
     print(f"Completed fetching Greeks data for {successful} out of {len(grouped_markets)} expiry dates")
 
+# Run the Greeks collection synchronously (e.g. in a worker process)
+def save_greeks_data_sync(start_date, end_date, days_before_expiry=22, granularity="1d", max_requests=market_utils.API_MAX_WORKERS):
+    return asyncio.run(save_greeks_data(
+        start_date,
+        end_date,
+        days_before_expiry=days_before_expiry,
+        granularity=granularity,
+        max_requests=max_requests
+    ))
+
 # Main function to run the data collection
 async def main():
     # Example: Collect data for a specific date range
@@ -4,17 +4,21 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Ensure output directory exists
 os.makedirs('analysis/greeks_summary', exist_ok=True)
 
-# List of Greek files to analyze
-market_files = [
-    './market-greeks/deribit-BTC-13DEC24-100000-C-option.csv',
-    './market-greeks/deribit-BTC-13DEC24-100000-P-option.csv',
-    './market-greeks/deribit-BTC-20DEC24-100000-C-option.csv',
-    './market-greeks/deribit-BTC-20DEC24-100000-P-option.csv'
+# Greeks dataset written by greeks.py (partitioned by expiry date)
+greeks_dataset = './market-greeks-parquet'
+
+# List of markets to analyze
+markets = [
+    'deribit-BTC-13DEC24-100000-C-option',
+    'deribit-BTC-13DEC24-100000-P-option',
+    'deribit-BTC-20DEC24-100000-C-option',
+    'deribit-BTC-20DEC24-100000-P-option'
 ]
 
 # Function to parse expiry date (13DEC24 format)
@@ -30,9 +34,9 @@ def parse_expiry_date(expiry_str):
     return datetime(year, month, int(day))
 
 # Function to load and process data
-def load_process_data(file_path):
-    # Extract key info from filename
-    parts = file_path.split('/')[-1].replace('.csv', '').split('-')
+def load_process_data(market):
+    # Extract key info from market name
+    parts = market.split('-')
     expiry_date_str = parts[2]
     strike = parts[3]
     option_type = 'Call' if parts[4] == 'C' else 'Put'
@@ -40,53 +44,58 @@ def load_process_data(file_path):
     # Parse expiry date
     expiry_datetime = parse_expiry_date(expiry_date_str)
     
-    # Read data with proper quote handling
-    df = pd.read_csv(file_path, quotechar='"')
+    # Read only this market's rows from its expiry partition; Parquet keeps the timestamp type
+    df = pd.read_parquet(
+        greeks_dataset,
+        columns=['time', 'vega', 'theta', 'rho', 'delta', 'gamma'],
+        filters=[
+            ('expiry_date', '==', expiry_datetime.date().isoformat()),
+            ('market', '==', market)
+        ]
+    )
+    if df.empty:
+        raise ValueError(f"No Greeks data found for {market}")
     
-    # Clean column values by removing quotes
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            df[col] = df[col].str.replace('"', '')
+    # Keep the Greeks as float32 (partitions written before greeks.py cast them may hold Float64)
+    df = df.astype({greek: 'float32' for greek in ['vega', 'theta', 'rho', 'delta', 'gamma']})
     
-    # Convert time to datetime and handle timezone
-    df['time'] = pd.to_datetime(df['time'])
+    # Handle timezone
     if df['time'].dt.tz is not None:
         df['time'] = df['time'].dt.tz_localize(None)
     
-    # Convert string values to numeric
-    for col in ['vega', 'theta', 'rho', 'delta', 'gamma']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
     # Calculate days to expiry
-    days_to_expiry = []
-    for t in df['time']:
-        days = (expiry_datetime - t).days
-        days_to_expiry.append(days)
-    df['days_to_expiry'] = days_to_expiry
+    df['days_to_expiry'] = (pd.Timestamp(expiry_datetime) - df['time']).dt.days.astype('int32')
     
     # Add metadata
-    df['option_info'] = f"{option_type} {strike} {expiry_date_str}"
+    # Constant per market, so build the categoricals straight from codes instead of a per-row list
+    df['option_info'] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype='int8'), categories=[f"{option_type} {strike} {expiry_date_str}"]
+    )
     df['expiry_date'] = expiry_datetime
     df['strike'] = int(strike)
-    df['option_type'] = option_type
+    df['option_type'] = pd.Categorical.from_codes(
+        np.full(len(df), ['Call', 'Put'].index(option_type), dtype='int8'), categories=['Call', 'Put']
+    )
     
     return df
 
-# Load all data
-dfs = []
-for file in market_files:
+# Function to load a market, returning None if it can't be loaded
+def try_load_process_data(market):
     try:
-        df = load_process_data(file)
-        dfs.append(df)
-        print(f"Loaded {file}: {len(df)} rows")
+        df = load_process_data(market)
+        print(f"Loaded {market}: {len(df)} rows")
+        return df
     except Exception as e:
-        print(f"Error loading {file}: {e}")
+        print(f"Error loading {market}: {e}")
+        return None
 
-all_data = pd.concat(dfs)
+# Load all data in parallel (file I/O and Arrow decoding release the GIL)
+with ThreadPoolExecutor(max_workers=len(markets)) as executor:
+    dfs = [df for df in executor.map(try_load_process_data, markets) if df is not None]
 
-# Print basic statistics for each file
+# Print basic statistics for each option
 print("===== Summary Statistics by Option =====")
-for file, df in zip(market_files, dfs):
+for df in dfs:
     option_info = df['option_info'].iloc[0]
     print(f"\n{option_info}")
     print(f"Time period: {df['time'].min().date()} to {df['time'].max().date()}")
@@ -100,25 +109,23 @@ for file, df in zip(market_files, dfs):
 # Create a summary table for comparisons
 summary_data = []
 for df in dfs:
-    option_info = df['option_info'].iloc[0]
-    option_type = df['option_type'].iloc[0]
-    strike = df['strike'].iloc[0]
-    expiry = df['expiry_date'].iloc[0]
+    # Each DataFrame holds a single market, so its metadata is constant and can be read from the first row
+    first_row = df.iloc[0]
     days_data = df['days_to_expiry'].max()
     
     # Calculate mean values for each Greek across the entire period
-    means = {greek: df[greek].mean() for greek in ['delta', 'gamma', 'vega', 'theta', 'rho']}
+    means = df[['delta', 'gamma', 'vega', 'theta', 'rho']].mean().to_dict()
     
-    # Calculate final values (most recent)
-    latest = df.sort_values('time').iloc[-1]
+    # Calculate final values (most recent) without sorting the whole frame
+    latest = df.loc[df['time'].idxmax()]
     final = {f"final_{greek}": latest[greek] for greek in ['delta', 'gamma', 'vega', 'theta', 'rho']}
     
     # Combine into a record
     record = {
-        'option_info': option_info,
-        'option_type': option_type,
-        'strike': strike,
-        'expiry_date': expiry,
+        'option_info': first_row['option_info'],
+        'option_type': first_row['option_type'],
+        'strike': first_row['strike'],
+        'expiry_date': first_row['expiry_date'],
         'days_data': days_data,
         **means,
         **final
@@ -132,178 +139,141 @@ print(summary_df[['option_info', 'days_data', 'delta', 'gamma', 'vega', 'theta',
 
 # Calculate put-call parity checks for matching pairs
 print("\n===== Put-Call Parity Analysis =====")
-for exp_date in summary_df['expiry_date'].unique():
-    exp_options = summary_df[summary_df['expiry_date'] == exp_date]
-    
-    for strike in exp_options['strike'].unique():
-        strike_options = exp_options[exp_options['strike'] == strike]
-        
-        if len(strike_options) >= 2:  # We have a pair
-            call_data = strike_options[strike_options['option_type'] == 'Call'].iloc[0]
-            put_data = strike_options[strike_options['option_type'] == 'Put'].iloc[0]
-            
-            print(f"\nStrike {strike}, Expiry {exp_date.date()}")
-            
-            # Delta relationship (should approximately sum to 1 for ATM options)
-            delta_sum = call_data['delta'] + (-put_data['delta'])
-            print(f"Delta relationship: {call_data['delta']:.4f} + ({-put_data['delta']:.4f}) = {delta_sum:.4f}")
-            
-            # Gamma relationship (should be similar for puts and calls)
-            gamma_ratio = call_data['gamma'] / put_data['gamma'] if put_data['gamma'] != 0 else float('inf')
-            print(f"Gamma similarity: Call={call_data['gamma']:.6f}, Put={put_data['gamma']:.6f}, Ratio={gamma_ratio:.4f}")
-            
-            # Vega relationship (should be similar for puts and calls)
-            vega_ratio = call_data['vega'] / put_data['vega'] if put_data['vega'] != 0 else float('inf')
-            print(f"Vega similarity: Call={call_data['vega']:.4f}, Put={put_data['vega']:.4f}, Ratio={vega_ratio:.4f}")
+parity_greeks = ['delta', 'gamma', 'vega']
+pairs = summary_df.pivot_table(
+    index=['expiry_date', 'strike'],
+    columns='option_type',
+    values=parity_greeks
+).reindex(columns=pd.MultiIndex.from_product([parity_greeks, ['Call', 'Put']])).dropna()  # Keep complete pairs only
+
+parity = pd.DataFrame(index=pairs.index)
+for greek in parity_greeks:
+    parity[f'call_{greek}'] = pairs[(greek, 'Call')]
+    parity[f'put_{greek}'] = pairs[(greek, 'Put')]
+
+# Delta relationship (should approximately sum to 1 for ATM options)
+parity['delta_sum'] = parity['call_delta'] - parity['put_delta']
+
+# Gamma and vega relationships (should be similar for puts and calls)
+for greek in ['gamma', 'vega']:
+    put_values = parity[f'put_{greek}']
+    parity[f'{greek}_ratio'] = (parity[f'call_{greek}'] / put_values).where(put_values != 0, np.inf)
+
+print(parity.to_string())
 
 # Function to create daily aggregates without resampling
 def daily_aggregate(df):
-    df['date'] = df['time'].dt.date
-    daily = df.groupby('date').agg({
+    # Group on midnight timestamps (int64 under the hood) rather than Python date objects
+    day = df['time'].dt.floor('D').rename('day')
+    daily = df.groupby(day, sort=True).agg({
         'delta': 'mean',
         'gamma': 'mean',
         'vega': 'mean',
         'theta': 'mean',
         'rho': 'mean',
         'time': 'min'  # Use the first time of each day
-    }).reset_index()
-    daily = daily.sort_values('time')
+    }).reset_index()  # Groups come out sorted by day, so already in time order
     return daily
 
-# Create a visualization showing the evolution of delta for different options
-plt.figure(figsize=(14, 7))
+# Compute daily aggregates once and share them across the comparison plots
+daily_dfs = [daily_aggregate(df) for df in dfs]
 
-for df in dfs:
-    # Sample data for clearer visualization
-    daily_data = daily_aggregate(df)
-    plt.plot(daily_data['time'], daily_data['delta'], label=df['option_info'].iloc[0], linewidth=2)
-
-plt.title('Delta Evolution Across Different Options')
-plt.xlabel('Date')
-plt.ylabel('Delta')
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=2))
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig('analysis/greeks_summary/delta_comparison.png')
-
-# Create visualization for gamma evolution
-plt.figure(figsize=(14, 7))
+# Create one figure showing the evolution of each Greek for different options
+fig, axes = plt.subplots(2, 2, figsize=(16, 10), sharex=True)
 
-for df in dfs:
-    daily_data = daily_aggregate(df)
-    plt.plot(daily_data['time'], daily_data['gamma'], label=df['option_info'].iloc[0], linewidth=2)
-
-plt.title('Gamma Evolution Across Different Options')
-plt.xlabel('Date')
-plt.ylabel('Gamma')
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=2))
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig('analysis/greeks_summary/gamma_comparison.png')
-
-# Create visualization for vega evolution
-plt.figure(figsize=(14, 7))
+for ax, greek in zip(axes.flat, ['delta', 'gamma', 'vega', 'theta']):
+    for daily_data, df in zip(daily_dfs, dfs):
+        ax.plot(daily_data['time'], daily_data[greek], label=df['option_info'].iloc[0], linewidth=2)
+    
+    ax.set_title(f'{greek.capitalize()} Evolution Across Different Options')
+    ax.set_ylabel(greek.capitalize())
+    ax.legend()
+    ax.grid(True, alpha=0.3)
 
-for df in dfs:
-    daily_data = daily_aggregate(df)
-    plt.plot(daily_data['time'], daily_data['vega'], label=df['option_info'].iloc[0], linewidth=2)
-
-plt.title('Vega Evolution Across Different Options')
-plt.xlabel('Date')
-plt.ylabel('Vega')
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=2))
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig('analysis/greeks_summary/vega_comparison.png')
-
-# Create visualization for theta evolution
-plt.figure(figsize=(14, 7))
+# The x-axis is shared, so the date locator and formatter only need to be set once
+axes[0, 0].xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+axes[0, 0].xaxis.set_major_locator(mdates.DayLocator(interval=2))
+for ax in axes[-1]:
+    ax.set_xlabel('Date')
+    ax.tick_params(axis='x', labelrotation=45)
 
-for df in dfs:
-    daily_data = daily_aggregate(df)
-    plt.plot(daily_data['time'], daily_data['theta'], label=df['option_info'].iloc[0], linewidth=2)
-
-plt.title('Theta Evolution Across Different Options')
-plt.xlabel('Date')
-plt.ylabel('Theta')
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=2))
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig('analysis/greeks_summary/theta_comparison.png')
+fig.tight_layout()
+fig.savefig('analysis/greeks_summary/greeks_comparison.png')
+
+# Function to get the min/max of a column across several DataFrames without concatenating them
+def column_range(frames, col):
+    # Reduce the per-frame results as a Series so missing values are skipped, as the concatenated min/max did
+    lows = pd.Series([df[col].min() for df in frames])
+    highs = pd.Series([df[col].max() for df in frames])
+    return lows.min(), highs.max()
 
 # Create a final assessment report
+# Each DataFrame holds a single option, so split calls and puts by frame
+calls = [df for df in dfs if df['option_type'].iloc[0] == 'Call']
+puts = [df for df in dfs if df['option_type'].iloc[0] == 'Put']
+
+# Check for delta values in expected ranges
+calls_delta_min, calls_delta_max = column_range(calls, 'delta')
+puts_delta_min, puts_delta_max = column_range(puts, 'delta')
+delta_valid = (0 <= calls_delta_max <= 1 and -1 <= puts_delta_min <= 0)
+
+# Check for extreme theta values
+calls_theta_min, calls_theta_max = column_range(calls, 'theta')
+puts_theta_min, puts_theta_max = column_range(puts, 'theta')
+
+# Get average gamma per day to expiry for assessment (aggregated per option, then combined)
+gamma_values = pd.concat([
+    df.groupby('days_to_expiry')['gamma'].mean().reset_index().assign(option_info=df['option_info'].iloc[0])
+    for df in dfs
+], ignore_index=True)
+
+report = f"""# Deribit Options Data Validity Assessment
+
+## Overview
+This report analyzes the collected options data from Deribit to assess its validity and plausibility.
+
+## Key Findings
+
+### Delta Values
+- Call options delta range: {calls_delta_min:.4f} to {calls_delta_max:.4f}
+- Put options delta range: {puts_delta_min:.4f} to {puts_delta_max:.4f}
+- Delta values within theoretical bounds: {'YES' if delta_valid else 'NO'}
+
+### Theta Values
+- Call options theta range: {calls_theta_min:.4f} to {calls_theta_max:.4f}
+- Put options theta range: {puts_theta_min:.4f} to {puts_theta_max:.4f}
+- Theta becomes more negative as expiration approaches: {'YES' if calls_theta_min < -10 else 'UNCERTAIN'}
+
+### Gamma Values
+- Gamma tends to increase as options approach expiration
+
+### Put-Call Consistency
+- Delta values for puts and calls show proper negative correlation
+- Gamma values are similar for puts and calls with same strike/expiry
+- Vega values are similar for puts and calls with same strike/expiry
+
+## Overall Assessment
+Based on the analysis, the collected data appears to be valid and plausible for the following reasons:
+
+1. Delta values are within expected theoretical ranges (0 to 1 for calls, -1 to 0 for puts)
+2. The relationship between put and call deltas follows expected patterns
+3. Theta becomes more negative as options approach expiration
+4. Gamma increases as options approach expiration
+5. Vega decreases as options approach expiration
+6. The magnitudes of the Greeks are consistent with typical option behavior
+
+## Data Collection Assessment
+The data collection methodology of capturing 22 days before expiration appears appropriate for the following reasons:
+
+1. The data shows clear patterns in Greeks evolution as options approach expiration
+2. Critical changes in Greeks values occur in the final weeks before expiration
+3. The 22-day period captures the accelerating time decay and changing sensitivity metrics
+
+## Recommendation
+The data appears to be suitable for further analysis and modeling purposes. The collection methodology is effective at capturing the most important price dynamics leading up to option expiration.
+"""
+
 with open('analysis/greeks_summary/data_validity_assessment.txt', 'w') as f:
-    f.write("# Deribit Options Data Validity Assessment\n\n")
-    
-    f.write("## Overview\n")
-    f.write("This report analyzes the collected options data from Deribit to assess its validity and plausibility.\n\n")
-    
-    f.write("## Key Findings\n\n")
-    
-    # Check for delta values in expected ranges
-    calls_delta = all_data[all_data['option_type'] == 'Call']['delta']
-    puts_delta = all_data[all_data['option_type'] == 'Put']['delta']
-    
-    f.write("### Delta Values\n")
-    f.write(f"- Call options delta range: {calls_delta.min():.4f} to {calls_delta.max():.4f}\n")
-    f.write(f"- Put options delta range: {puts_delta.min():.4f} to {puts_delta.max():.4f}\n")
-    
-    delta_valid = (0 <= calls_delta.max() <= 1 and -1 <= puts_delta.min() <= 0)
-    f.write(f"- Delta values within theoretical bounds: {'YES' if delta_valid else 'NO'}\n\n")
-    
-    # Check for extreme theta values
-    f.write("### Theta Values\n")
-    calls_theta = all_data[all_data['option_type'] == 'Call']['theta']
-    puts_theta = all_data[all_data['option_type'] == 'Put']['theta']
-    
-    f.write(f"- Call options theta range: {calls_theta.min():.4f} to {calls_theta.max():.4f}\n")
-    f.write(f"- Put options theta range: {puts_theta.min():.4f} to {puts_theta.max():.4f}\n")
-    f.write(f"- Theta becomes more negative as expiration approaches: {'YES' if calls_theta.min() < -10 else 'UNCERTAIN'}\n\n")
-    
-    # Check for gamma behavior
-    f.write("### Gamma Values\n")
-    
-    # Get average gamma per day to expiry for assessment
-    all_data['expiry_group'] = all_data['option_info'] + '-' + all_data['days_to_expiry'].astype(str)
-    gamma_values = all_data.groupby(['expiry_group'])['gamma'].mean().reset_index()
-    
-    f.write(f"- Gamma tends to increase as options approach expiration\n\n")
-    
-    # Check for consistency across option types
-    f.write("### Put-Call Consistency\n")
-    f.write("- Delta values for puts and calls show proper negative correlation\n")
-    f.write("- Gamma values are similar for puts and calls with same strike/expiry\n")
-    f.write("- Vega values are similar for puts and calls with same strike/expiry\n\n")
-    
-    # Overall assessment
-    f.write("## Overall Assessment\n")
-    f.write("Based on the analysis, the collected data appears to be valid and plausible for the following reasons:\n\n")
-    f.write("1. Delta values are within expected theoretical ranges (0 to 1 for calls, -1 to 0 for puts)\n")
-    f.write("2. The relationship between put and call deltas follows expected patterns\n")
-    f.write("3. Theta becomes more negative as options approach expiration\n")
-    f.write("4. Gamma increases as options approach expiration\n")
-    f.write("5. Vega decreases as options approach expiration\n")
-    f.write("6. The magnitudes of the Greeks are consistent with typical option behavior\n\n")
-    
-    f.write("## Data Collection Assessment\n")
-    f.write("The data collection methodology of capturing 22 days before expiration appears appropriate for the following reasons:\n\n")
-    f.write("1. The data shows clear patterns in Greeks evolution as options approach expiration\n")
-    f.write("2. Critical changes in Greeks values occur in the final weeks before expiration\n")
-    f.write("3. The 22-day period captures the accelerating time decay and changing sensitivity metrics\n\n")
-    
-    f.write("## Recommendation\n")
-    f.write("The data appears to be suitable for further analysis and modeling purposes. The collection methodology is effective at capturing the most important price dynamics leading up to option expiration.\n")
+    f.write(report)
 
 print("\nSummary report and visualizations created in analysis/greeks_summary/ directory")
\ No newline at end of file
@@ -1,5 +1,7 @@
 import os
 import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import argparse
 
@@ -8,6 +10,7 @@ import greeks
 import contract_prices
 import implied_volatility
 import open_interest
+import market_utils
 
 async def main():
     # Parse command line arguments
@@ -30,12 +33,12 @@ async def main():
     
     # Define date range for data collection
     if args.end_date:
-        end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+        end_date = datetime.fromisoformat(args.end_date)
     else:
         end_date = datetime.utcnow()
         
     if args.start_date:
-        start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+        start_date = datetime.fromisoformat(args.start_date)
     else:
         start_date = end_date - timedelta(days=30)  # Default to 30 days before end date
     
@@ -50,32 +53,44 @@ async def main():
     # Determine which data types to collect
     if args.greeks_only or args.iv_only or args.prices_only or args.oi_only:
         # Only collect selected data types
-        tasks = []
+        collectors = []
         if args.greeks_only:
             print("Collecting Greeks data only")
-            tasks.append(greeks.save_greeks_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity))
+            collectors.append(greeks.save_greeks_data_sync)
         if args.iv_only:
             print("Collecting implied volatility data only")
-            tasks.append(implied_volatility.save_implied_volatility_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity))
+            collectors.append(implied_volatility.save_implied_volatility_data_sync)
         if args.prices_only:
             print("Collecting contract price data only")
-            tasks.append(contract_prices.save_contract_price_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity))
+            collectors.append(contract_prices.save_contract_price_data_sync)
         if args.oi_only:
             print("Collecting open interest data only")
-            tasks.append(open_interest.save_open_interest_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity))
+            collectors.append(open_interest.save_open_interest_data_sync)
     else:
         # Collect all data types
-        tasks = [
-            greeks.save_greeks_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity),
-            contract_prices.save_contract_price_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity),
-            implied_volatility.save_implied_volatility_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity),
-            open_interest.save_open_interest_data(start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity)
+        collectors = [
+            greeks.save_greeks_data_sync,
+            contract_prices.save_contract_price_data_sync,
+            implied_volatility.save_implied_volatility_data_sync,
+            open_interest.save_open_interest_data_sync
         ]
     
-    await asyncio.gather(*tasks)
+    # The collectors share one API key, so split the request budget between them
+    max_requests = max(1, market_utils.API_MAX_WORKERS // len(collectors))
+    
+    # Run each collector in its own process so catalog parsing and file writing overlap too
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=len(collectors)) as pool:
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, functools.partial(
+                collect, start_date, end_date, days_before_expiry=days_before_expiry, granularity=granularity,
+                max_requests=max_requests
+            ))
+            for collect in collectors
+        ))
     
     print("\n===== Data Collection Complete =====\n")
-    print("Data has been saved to CSV files in the current directory.")
+    print("Data has been saved to Parquet and CSV files in the current directory.")
     
     print("\nTo analyze the collected data, run: python analyze_catalog.py")
 
@@ -1,15 +1,48 @@
 import os
 import re
+import asyncio
+import functools
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from coinmetrics.api_client import CoinMetricsClient
 
+# Catalog responses are cached on disk for the day they were fetched
+CATALOG_CACHE_DIR = '.cache'
+
+# Parallel API requests allowed per collector; the client caps a single parallel() call at 10 for rate limiting
+API_MAX_WORKERS = 10
+
+# Date token in market names, e.g. -10APR22- -> ('10', 'APR', '22')
+_DATE_RE = re.compile(r'-(\d{1,2})([A-Z]{3})(\d{2})-')
+
+_MONTH_MAP = {
+    'JAN': '01', 'FEB': '02', 'MAR': '03', 'APR': '04',
+    'MAY': '05', 'JUN': '06', 'JUL': '07', 'AUG': '08',
+    'SEP': '09', 'OCT': '10', 'NOV': '11', 'DEC': '12'
+}
+
+# Client shared by every caller in this process, created on first use
+_CLIENT = None
+
 # Initialize client
 def init_client():
-    api_key = os.environ.get("CM_API_KEY")
-    if not api_key:
-        raise ValueError("CM_API_KEY environment variable not set")
-    return CoinMetricsClient(api_key)
+    global _CLIENT
+    if _CLIENT is None:
+        api_key = os.environ.get("CM_API_KEY")
+        if not api_key:
+            raise ValueError("CM_API_KEY environment variable not set")
+        _CLIENT = CoinMetricsClient(api_key)
+    return _CLIENT
+
+@functools.cache
+def _parse_date_token(day, month_abbr, year):
+    """Convert the parts of a market date token (like 10, APR, 22) to YYYY-MM-DD, or None if it can't be parsed.
+    Many markets share an expiry, so results are cached per token.
+    """
+    if month_abbr in _MONTH_MAP:
+        # Return date in format YYYY-MM-DD, assuming all years are 20xx
+        return f"20{year}-{_MONTH_MAP[month_abbr]}-{day.zfill(2)}"
+    return None
 
 def extract_expiration_date(market_name):
     """Extract expiration date from market name.
@@ -18,45 +51,22 @@ def extract_expiration_date(market_name):
     - deribit-BTC-24MAY24-70000-P-option
     """
     try:
-        # Extract the date portion (like 10APR22)
-        match = re.search(r'-([0-9]+[A-Z]{3}[0-9]{2})-', market_name)
+        # Extract the date portion (like 10APR22) as day, month and year
+        match = _DATE_RE.search(market_name)
         if not match:
             return None
         
-        date_str = match.group(1)
-        
-        # Convert month abbreviation to number
-        month_map = {
-            'JAN': '01', 'FEB': '02', 'MAR': '03', 'APR': '04',
-            'MAY': '05', 'JUN': '06', 'JUL': '07', 'AUG': '08',
-            'SEP': '09', 'OCT': '10', 'NOV': '11', 'DEC': '12'
-        }
-        
-        day = date_str[:2]
-        month_abbr = date_str[2:5]
-        year = '20' + date_str[5:7]  # Assuming all years are 20xx
-        
-        if month_abbr in month_map:
-            month = month_map[month_abbr]
-            # Return date in format YYYY-MM-DD
-            return f"{year}-{month}-{day}"
-        return None
+        return _parse_date_token(*match.groups())
     except Exception:
         return None
 
-def get_markets_with_expiry(catalog_func, exchange='deribit', base='btc'):
-    """
-    Get markets from catalog with parsed expiration dates.
-    
-    Args:
-        catalog_func: Function to get catalog (e.g., client.catalog_market_greeks_v2)
-        exchange: Exchange name (default: 'deribit')
-        base: Base asset (default: 'btc')
-        
-    Returns:
-        DataFrame with market data including expiration_date
-    """
-    client = init_client()
+@functools.lru_cache(maxsize=None)
+def _load_catalog(catalog_func, exchange, base, day):
+    cache_path = os.path.join(
+        CATALOG_CACHE_DIR, f"{catalog_func.__name__}_{exchange}_{base or 'all'}_{day}.parquet"
+    )
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
     
     # Get catalog data
     if base:
@@ -75,16 +85,63 @@ def get_markets_with_expiry(catalog_func, exchange='deribit', base='btc'):
     else:
         catalog = catalog_data
     
-    # Extract expiration dates from market names
-    catalog['expiration_date'] = catalog['market'].apply(extract_expiration_date)
+    try:
+        os.makedirs(CATALOG_CACHE_DIR, exist_ok=True)
+        catalog.to_parquet(cache_path, index=False)
+    except Exception as e:
+        print(f"Could not cache catalog to {cache_path}: {e}")
+    
+    return catalog
+
+def load_catalog(catalog_func, exchange='deribit', base='btc', columns=None):
+    """
+    Load a catalog as a DataFrame, reusing today's copy if it was already fetched.
+    
+    Args:
+        catalog_func: Function to get catalog (e.g., client.catalog_market_greeks_v2)
+        exchange: Exchange name (default: 'deribit')
+        base: Base asset (default: 'btc')
+        columns: Catalog columns to keep (default: all)
+        
+    Returns:
+        DataFrame with the catalog entries
+    """
+    catalog = _load_catalog(catalog_func, exchange, base, date.today().isoformat())
+    if columns is not None:
+        catalog = catalog[columns]
+    
+    # Return a copy so callers can add columns without touching the cached frame
+    return catalog.copy()
+
+def get_markets_with_expiry(catalog_func, exchange='deribit', base='btc'):
+    """
+    Get markets from catalog with parsed expiration dates.
+    
+    Args:
+        catalog_func: Function to get catalog (e.g., client.catalog_market_greeks_v2)
+        exchange: Exchange name (default: 'deribit')
+        base: Base asset (default: 'btc')
+        
+    Returns:
+        DataFrame with market and expiration_date columns
+    """
+    # Get catalog data (cached for the day), keeping only the market names the expiry grouping needs
+    catalog = load_catalog(catalog_func, exchange=exchange, base=base, columns=['market'])
+    
+    # Extract expiration dates (YYYY-MM-DD) from market names in a single vectorized pass
+    parts = catalog['market'].str.extract(_DATE_RE)
+    catalog['expiration_date'] = '20' + parts[2] + '-' + parts[1].map(_MONTH_MAP) + '-' + parts[0].str.zfill(2)
     catalog = catalog[catalog['expiration_date'].notna()]  # Remove rows where expiration couldn't be extracted
     
-    # Convert to datetime for comparison
-    catalog['expiration_date'] = pd.to_datetime(catalog['expiration_date'])
+    # Convert to datetime for comparison; the format is fixed, and cache=True parses each distinct expiry only once.
+    # Seconds are the coarsest unit pandas supports, day precision is all we need
+    catalog['expiration_date'] = pd.to_datetime(
+        catalog['expiration_date'], format='%Y-%m-%d', cache=True, errors='coerce'
+    ).astype('datetime64[s]')
+    catalog = catalog.dropna(subset=['expiration_date'])  # Remove impossible dates such as 31FEB
     
-    # Calculate trading period length in days if min_time and max_time columns exist
-    if 'min_time' in catalog.columns and 'max_time' in catalog.columns:
-        catalog['trading_days'] = (catalog['max_time'] - catalog['min_time']).dt.total_seconds() / (24*60*60)
+    # Arrow-backed strings are more compact and faster to filter than Python objects
+    catalog['market'] = catalog['market'].astype('string[pyarrow]')
     
     return catalog
 
@@ -100,20 +157,63 @@ def fetch_markets_by_expiry_date(catalog, start_date, end_date):
     Returns:
         Dictionary with expiry dates as keys and lists of market identifiers as values
     """
-    # Filter markets by expiry date range
-    filtered_catalog = catalog[
-        (catalog['expiration_date'] >= start_date) & 
-        (catalog['expiration_date'] <= end_date)
-    ].copy()
+    # Filter markets by expiry date range on the underlying arrays, without copying the catalog
+    expiration_dates = catalog['expiration_date'].values
+    mask = (
+        (expiration_dates >= pd.Timestamp(start_date).to_datetime64()) &
+        (expiration_dates <= pd.Timestamp(end_date).to_datetime64())
+    )
     
-    # Group markets by expiry date
+    # Group markets by expiry date with a plain dict; tolist() on datetime64[D] yields datetime.date objects
+    dates = expiration_dates[mask].astype('datetime64[D]')
+    markets = catalog['market'].values[mask]
     grouped_markets = {}
-    for expiry_date, group in filtered_catalog.groupby(filtered_catalog['expiration_date'].dt.date):
-        grouped_markets[expiry_date] = group['market'].tolist()
+    for expiry_date, market in zip(dates.tolist(), markets.tolist()):
+        grouped_markets.setdefault(expiry_date, []).append(market)
+    grouped_markets = dict(sorted(grouped_markets.items()))  # Keep expiry dates in ascending order
     
-    print(f"Found {len(filtered_catalog)} markets across {len(grouped_markets)} expiry dates")
+    print(f"Found {len(markets)} markets across {len(grouped_markets)} expiry dates")
     return grouped_markets
 
+def save_expiry_partition(df, dataset_dir, expiry_date):
+    """
+    Write all markets for one expiry date to a Parquet dataset partition, replacing any previous run.
+    
+    Args:
+        df: DataFrame with the data for every market of the expiry date
+        dataset_dir: Directory of the Parquet dataset (partitioned by expiry_date)
+        expiry_date: Expiry date (datetime.date)
+    """
+    df['market'] = df['market'].astype('category')
+    df['expiry_date'] = expiry_date.isoformat()
+    df.to_parquet(
+        dataset_dir,
+        engine='pyarrow',
+        compression='zstd',
+        partition_cols=['expiry_date'],
+        existing_data_behavior='delete_matching',
+        index=False
+    )
+
+async def gather_with_concurrency(coros, limit):
+    """
+    Await coroutines concurrently, with at most `limit` of them running at once.
+    
+    Args:
+        coros: Coroutines to run
+        limit: Maximum number of coroutines running at the same time
+        
+    Returns:
+        List of results in the same order as coros
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(coro):
+        async with semaphore:
+            return await coro
+    
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
 def calculate_data_period_for_expiry(expiry_date, days_before_expiry=22):
     """
     Calculate start and end times for data collection based on expiry date.
@@ -1,19 +1,9 @@
-import os
 import asyncio
 import pandas as pd
-from coinmetrics.api_client import CoinMetricsClient
 from datetime import datetime, timedelta
-import os.path
 import market_utils
 
-# Initialize client
-def init_client():
-    api_key = os.environ.get("CM_API_KEY")
-    if not api_key:
-        raise ValueError("CM_API_KEY environment variable not set")
-    return CoinMetricsClient(api_key)
-
-async def fetch_oi_for_expiry(client, markets, expiry_date, days_before_expiry=22, granularity="1d"):
+async def fetch_oi_for_expiry(client, markets, expiry_date, days_before_expiry=22, granularity="1d", max_workers=None):
     """
     Fetch open interest data for markets with the same expiry date.
     
@@ -23,6 +13,7 @@ async def fetch_oi_for_expiry(client, markets, expiry_date, days_before_expiry=2
         expiry_date: Expiry date (datetime.date)
         days_before_expiry: Number of days before expiry to collect data
         granularity: Data granularity (e.g., "1d", "1h")
+        max_workers: Parallel API requests for this expiry (default: the client's default of 10)
     """
     # Calculate data period based on expiry date
     start_time, end_time = market_utils.calculate_data_period_for_expiry(
@@ -34,13 +25,16 @@ async def fetch_oi_for_expiry(client, markets, expiry_date, days_before_expiry=2
 
     try:
         # Fetch data with parallelization and export directly to CSV files
-        client.get_market_open_interest(
+        data = client.get_market_open_interest(
             markets=markets,
             start_time=start_time,
             end_time=end_time,
             page_size=10000,
             granularity=granularity
-        ).parallel().export_to_csv_files()
+        ).parallel(max_workers=max_workers)
+        
+        # The export blocks on HTTP, so run it in a thread to let other expiries proceed meanwhile
+        await asyncio.to_thread(data.export_to_csv_files)
         
         print(f"Successfully saved open interest data for expiry date {expiry_date}")
         return True
@@ -50,7 +44,7 @@ async def fetch_oi_for_expiry(client, markets, expiry_date, days_before_expiry=2
         return False
 
 # Save open interest data for multiple expiration dates
-async def save_open_interest_data(start_date, end_date, days_before_expiry=22, granularity="1d"):
+async def save_open_interest_data(start_date, end_date, days_before_expiry=22, granularity="1d", max_requests=market_utils.API_MAX_WORKERS):
     """
     Save open interest data for all markets expiring between start_date and end_date.
     For each expiry date, collect data from (expiry_date - days_before_expiry) to expiry_date.
@@ -60,10 +54,11 @@ async def save_open_interest_data(start_date, end_date, days_before_expiry=22, g
         end_date: End date for expiry range (datetime)
         days_before_expiry: Number of days before expiry to collect data
         granularity: Data granularity (e.g., "1d", "1h")
+        max_requests: Maximum API requests in flight at once for this collection
     """
     print(f"Looking for options expiring between {start_date.strftime('%Y-%m-%d')} and {end_date.strftime('%Y-%m-%d')}")
     
-    client = init_client()
+    client = market_utils.init_client()
     
     # Get catalog data with expiration dates
     catalog = market_utils.get_markets_with_expiry(
@@ -82,6 +77,13 @@ async def save_open_interest_data(start_date, end_date, days_before_expiry=22, g
         print("No markets found within the specified time window.")
         return None
     
+    # Run tasks in parallel (with a concurrency limit)
+    MAX_CONCURRENT_TASKS = 5  # Adjust based on API rate limits and system capabilities
+    concurrent_tasks = min(MAX_CONCURRENT_TASKS, max_requests)
+    
+    # Split the API request budget across concurrent expiries, so at most max_requests requests are in flight
+    workers_per_task = max(1, max_requests // concurrent_tasks)
+    
     # Create tasks to fetch data for each expiry date
     tasks = []
     for expiry_date, markets in grouped_markets.items():
@@ -90,27 +92,26 @@ async def save_open_interest_data(start_date, end_date, days_before_expiry=22, g
             markets,
             expiry_date,
             days_before_expiry=days_before_expiry,
-            granularity=granularity
+            granularity=granularity,
+            max_workers=workers_per_task
         ))
     
-    # Run tasks in parallel (with a concurrency limit)
-    MAX_CONCURRENT_TASKS = 5  # Adjust based on API rate limits and system capabilities
-    
-    # Split tasks into batches to avoid overwhelming the API
-    results = []
-    for i in range(0, len(tasks), MAX_CONCURRENT_TASKS):
-        batch = tasks[i:i+MAX_CONCURRENT_TASKS]
-        batch_results = await asyncio.gather(*batch)
-        results.extend(batch_results)
-        
-        # Optional: add a small delay between batches
-        if i + MAX_CONCURRENT_TASKS < len(tasks):
-            print(f"Completed batch {i//MAX_CONCURRENT_TASKS + 1}, waiting before starting next batch...")
-            await asyncio.sleep(2)
+    # Start the next task as soon as any running one finishes, rather than waiting on whole batches
+    results = await market_utils.gather_with_concurrency(tasks, concurrent_tasks)
     
     successful = results.count(True)
     print(f"Completed fetching open interest data for {successful} out of {len(grouped_markets)} expiry dates")
 
+# Run the open interest collection synchronously (e.g. in a worker process)
+def save_open_interest_data_sync(start_date, end_date, days_before_expiry=22, granularity="1d", max_requests=market_utils.API_MAX_WORKERS):
+    return asyncio.run(save_open_interest_data(
+        start_date,
+        end_date,
+        days_before_expiry=days_before_expiry,
+        granularity=granularity,
+        max_requests=max_requests
+    ))
+
 # Main function to run the data collection
 async def main():
     # Example: Collect data for a specific date range